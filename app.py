@@ -5,4 +5,5 @@ from dotenv import load_dotenv, find_dotenv
 if __name__ == "__main__":
     load_dotenv(find_dotenv())
 
-    uvicorn.run("server:app", host="0.0.0.0", port=9999, reload=True) 
\ No newline at end of file
+    # SSE streams on /app/stream never finish on their own; don't let them block reloads/exit
+    uvicorn.run("server:app", host="0.0.0.0", port=9999, reload=True, timeout_graceful_shutdown=3) 
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+Offline benchmark: full vs delta descriptions over a sequence of frames.
+
+Runs every frame in --frames_dir (sorted by name, i.e. capture time) through
+tongyi_get_description_from_image twice, once asking for a full description
+and once in delta mode, then reports output tokens and latency.
+
+    python bench_delta.py --frames_dir ./uploaded_images/ > bench_output.txt
+"""
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv, find_dotenv
+
+from llm_core.llm_core import tingjianLLM
+from utils.scene_tracker import SceneTracker
+
+
+def capture_time(frame):
+    # Frames are saved by server._save_image as %Y-%m-%d_%H%M%S.%f.jpg
+    try:
+        return datetime.strptime(os.path.splitext(os.path.basename(frame))[0], "%Y-%m-%d_%H%M%S.%f").timestamp()
+    except ValueError:
+        return os.path.getmtime(frame)
+
+
+def run(llm, frames):
+    """
+    Describe each frame in both modes back to back, alternating which goes
+    first, so provider warm-up, caching and load drift hit both modes alike.
+    """
+    tracker = SceneTracker()
+    results = {mode: {"tokens": [], "latencies": [], "full_count": 0} for mode in ("full", "delta")}
+    for i, frame in enumerate(frames):
+        # Replay at the real capture interval, not back to back at model latency
+        now = capture_time(frame)
+        previous_description = tracker.previous_description("bench", frame, now=now)
+
+        for mode in (("full", "delta") if i % 2 == 0 else ("delta", "full")):
+            previous = previous_description if mode == "delta" else None
+            start_time = time.time()
+            description = llm.tongyi_get_description_from_image(frame, previous_description=previous)
+            results[mode]["latencies"].append(time.time() - start_time)
+            results[mode]["tokens"].append(llm.last_usage.completion_tokens if llm.last_usage else 0)
+            results[mode]["full_count"] += previous is None
+            if mode == "delta":
+                tracker.update("bench", frame, description, is_delta=previous is not None, now=now)
+    return results
+
+
+def report(name, tokens, latencies, full_count):
+    print(
+        f"{name:>5}: frames={len(tokens)} full={full_count} "
+        f"output_tokens mean={statistics.mean(tokens):.1f} total={sum(tokens)} "
+        f"latency mean={statistics.mean(latencies):.2f}s p50={statistics.median(latencies):.2f}s"
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare full and delta descriptions.")
+    parser.add_argument('--frames_dir', type=str, required=True, help='Directory of .jpg frames in capture order')
+    parser.add_argument('--limit', type=int, default=None, help='Only use the first N frames')
+    args = parser.parse_args()
+
+    load_dotenv(find_dotenv())
+
+    frames = sorted(os.path.join(args.frames_dir, f) for f in os.listdir(args.frames_dir) if f.endswith(".jpg"))
+    frames = frames[:args.limit]
+    if not frames:
+        raise SystemExit(f"No .jpg frames found in {args.frames_dir}")
+
+    llm = tingjianLLM()
+    results = run(llm, frames)
+    full, delta = results["full"], results["delta"]
+
+    report("full", **full)
+    report("delta", **delta)
+    print(
+        f"output tokens: {sum(delta['tokens']) / max(sum(full['tokens']), 1) - 1:+.0%}, "
+        f"mean latency: {statistics.mean(delta['latencies']) / statistics.mean(full['latencies']) - 1:+.0%}"
+    )
@@ -1,5 +1,6 @@
 
 import os
+import re
 print(os.getcwd())
 
 from openai import OpenAI
@@ -11,6 +12,28 @@ from utils.log_utils import get_logger
 
 logger = get_logger()
 
+# Delta replies carry this marker when nothing worth saying has changed
+NO_CHANGE_MARKER = "NO_CHANGE"
+
+# Shared by the full and delta description prompts, hazards must never be dropped
+HAZARD_PROMPT = '''
+        - 如果有如下物品请注意描述不要忽略:
+            1. 交通信号灯, 如 ”现在是红灯“
+            2. 人行横道线, 如 ”人行横道线在正前面“
+            3. 交通站点建筑, 如 ”公交车站在左边“ “前方是地下通道入口”
+            4. 地名/位置 指示牌, 如 ”1号出口在右边“ “这里是地铁10号线的入口”
+            5. 盲道, 如 ”盲道在右边“
+        
+        - 如果照片中道路被堵塞, 请你描述道路的情况和周围的环境。帮助用户离开堵塞的地方.
+            例如: "前面有一辆车挡住了路, 你可以向左转, 继续前行." "前方有一个大坑, 请小心行走." "前面有一个人挡住了路, 请向右转." "前面有一个台阶, 请小心上下." "前方有一个栏杆,请向右转绕开."
+            
+'''
+
+
+def is_no_change(reply):
+    """True if a delta reply carries the no-change marker, tolerating spacing, case and punctuation."""
+    return NO_CHANGE_MARKER in re.sub(r"[\s\-]+", "_", (reply or "").strip().upper())
+
 
 class tingjianLLM:
     def __init__(self):
@@ -31,6 +54,9 @@ class tingjianLLM:
             self.client = None
             raise ValueError("Missing LLM KEY")
 
+        # Token usage of the last _tongyi_chat call, read by bench_delta.py
+        self.last_usage = None
+
 
     # Helper function to generate descriptions using OpenAI
     def openai_get_description_from_image(self, image):
@@ -57,11 +83,15 @@ class tingjianLLM:
         logger.info(f"Response content: {response.choices[0].message.content}")
         return response.choices[0].message.content
 
-    def tongyi_get_description_from_image(self, image_fp, question="请为我描述周围的环境"):
+    def tongyi_get_description_from_image(self, image_fp, question="请为我描述周围的环境", previous_description=None, detections=None):
+        if previous_description:
+            return self._tongyi_get_delta_from_image(image_fp, previous_description, detections)
+
         logger.info("getting description using tongyi qwen")
-        base64_image = base64_encode_image(image_fp)
+        if detections:
+            question = f"{question}\n本地检测到的物体: {', '.join(detections)}"
 
-        system_prompt = '''
+        system_prompt = f'''
         你是一个导盲助手, 这是一张来自盲人举起手机拍摄的正前方的照片.照片的左侧是拍摄者的左手方向 , 右侧是拍摄者的右手方向.
         你需要为他描述周围的环境. 请注意,他的眼睛是看不到的.
         使用中文进行回复.避免使用列表、加粗等格式符号,只保留文字
@@ -72,19 +102,38 @@ class tingjianLLM:
         
         - 你可以使用以下格式描述物体和位置关系:
             "在...的前面"、"在...的后面"、"在...的左边"、"在...的右边"、"在...的上面"、"在...的下面"
+{HAZARD_PROMPT}
+        '''
 
-        - 如果有如下物品请注意描述不要忽略:
-            1. 交通信号灯, 如 ”现在是红灯“
-            2. 人行横道线, 如 ”人行横道线在正前面“
-            3. 交通站点建筑, 如 ”公交车站在左边“ “前方是地下通道入口”
-            4. 地名/位置 指示牌, 如 ”1号出口在右边“ “这里是地铁10号线的入口”
-            5. 盲道, 如 ”盲道在右边“
-        
-        - 如果照片中道路被堵塞, 请你描述道路的情况和周围的环境。帮助用户离开堵塞的地方.
-            例如: "前面有一辆车挡住了路, 你可以向左转, 继续前行." "前方有一个大坑, 请小心行走." "前面有一个人挡住了路, 请向右转." "前面有一个台阶, 请小心上下." "前方有一个栏杆,请向右转绕开."
-            
+        return self._tongyi_chat(image_fp, system_prompt, question)
+
+    def _tongyi_get_delta_from_image(self, image_fp, previous_description, detections=None):
+        """Ask only for what changed. Returns "" when nothing is worth saying."""
+        logger.info("getting delta description using tongyi qwen")
+
+        system_prompt = f'''
+        你是一个导盲助手, 这是一张来自盲人举起手机拍摄的正前方的照片.照片的左侧是拍摄者的左手方向 , 右侧是拍摄者的右手方向.
+        几秒钟前你已经为他描述过周围的环境, 他已经听过了. 请注意,他的眼睛是看不到的.
+        使用中文进行回复.避免使用列表、加粗等格式符号,只保留文字
+
+        只描述和之前相比新出现的、消失的或者位置发生变化的主要物品, 不要重复没有变化的普通物品.
+        交通信号灯颜色变化、新出现的文字和指示牌, 请一定要说明.
+        仍然在他前进路线上的危险和障碍 (台阶、坑、车辆、栏杆、行人等) 每次都必须再次提醒, 即使之前已经说过.
+        回答越短越好, 一到两句话即可.
+{HAZARD_PROMPT}
+        如果没有值得注意的变化, 并且前进路线上没有危险, 请只回复: {NO_CHANGE_MARKER}
         '''
 
+        question = f"之前的描述:\n{previous_description}\n请告诉我有什么变化."
+        if detections:
+            question = f"{question}\n本地检测到的物体: {', '.join(detections)}"
+
+        reply = self._tongyi_chat(image_fp, system_prompt, question)
+        return "" if is_no_change(reply) else reply
+
+    def _tongyi_chat(self, image_fp, system_prompt, question):
+        base64_image = base64_encode_image(image_fp)
+
         messages = [
                 {"role":"system",
                 "content": [
@@ -109,6 +158,7 @@ class tingjianLLM:
             model=self.DASHSCOPE_MODEL,
             messages=messages,
         )
+        self.last_usage = response.usage
         
         logger.debug(f"Response: {response}")
         logger.info(f"Response content: {response.choices[0].message.content}")
@@ -1,3 +1,4 @@
+import hashlib
 import io
 import os
 import time
@@ -6,7 +7,7 @@ from PIL import Image, ImageOps
 from fastapi import FastAPI, Request, Response, HTTPException, status, Depends,Security
 from fastapi.security.api_key import APIKeyHeader
 
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -21,6 +22,9 @@ from contextlib import asynccontextmanager
 
 from llm_core.llm_core import tingjianLLM
 from utils.log_utils import get_logger
+from utils.profiling import RequestProfiler
+from utils.live_feed import LatestFrame
+from utils.scene_tracker import SceneTracker
 
 
 
@@ -32,6 +36,10 @@ llm_client = tingjianLLM()
 
 LATEST_IMAGE = None
 STATIC_IMAGE_DIR = "./uploaded_images/"
+latest_frame = LatestFrame()
+# Delta descriptions: only report what changed since the device's last description
+DELTA_DESCRIPTIONS = os.getenv("DELTA_DESCRIPTIONS", "0") == "1"
+scene_tracker = SceneTracker()
 
 # Startup event
 @asynccontextmanager
@@ -39,8 +47,10 @@ async def lifespan(app: FastAPI):
     if not os.path.exists("uploaded_images"):
         logger.info("Creating uploaded_images directory")
         os.makedirs("uploaded_images")
+    latest_frame.load_from_dir(STATIC_IMAGE_DIR, lambda name: app.url_path_for("static", path=name))
     logger.info("Startup event completed.")
     yield
+    latest_frame.close()
     logger.info("Shutdown event completed.")
 
 async def some_authz_func(request: Request):
@@ -95,42 +105,42 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type"],
 )
 
+# Opt-in sampling profiler, see utils/profiling.py
+app.middleware("http")(RequestProfiler(skip_paths=(f"{PREFIX}/static", f"{PREFIX}/stream")))
+
 
 # Routes
 @app.get(f"{PREFIX}/", response_class=HTMLResponse)
 async def index(request: Request):
-    image_dir = "./uploaded_images/"
-    images = sorted(
-        [f for f in os.listdir(image_dir) if f.endswith(".jpg")],
-        key=lambda x: os.path.getmtime(os.path.join(image_dir, x)),
-        reverse=True,
-    )
-    descriptions = sorted(
-        [f for f in os.listdir(image_dir) if f.endswith(".txt")],
-        key=lambda x: os.path.getmtime(os.path.join(image_dir, x)),
-        reverse=True,
-    )
-
-    latest_image = images[0] if images else None
-    latest_description = descriptions[0] if descriptions else None
-
-    # latest_image_url = f"/static/{latest_image}" if latest_image else None
-    latest_image_url = app.url_path_for("static", path=latest_image) if latest_image else None
-    latest_description_text = (
-        open(os.path.join(image_dir, latest_description)).read()
-        if latest_description
-        else "No description available."
-    )
-
     return templates.TemplateResponse(
         "index.html",
         {
             "request": request,
-            "latest_image": latest_image_url,
-            "latest_description": latest_description_text,
+            "latest_image": latest_frame.image_url,
+            "latest_description": latest_frame.description or "No description available.",
+            "stream_url": app.url_path_for("stream"),
         }
     )
 
+@app.get(f"{PREFIX}/latest")
+async def latest(request: Request):
+    headers = {"ETag": latest_frame.etag, "Cache-Control": "no-cache"}
+    if latest_frame.matches(request.headers.get("if-none-match")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=json.dumps(latest_frame.to_dict(), ensure_ascii=False),
+        media_type="application/json",
+        headers=headers,
+    )
+
+@app.get(f"{PREFIX}/stream", name="stream")
+async def stream(request: Request):
+    return StreamingResponse(
+        latest_frame.stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.post(f"{PREFIX}/upload")
 async def upload_image(request: Request, credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
 
@@ -143,24 +153,55 @@ async def upload_image(request: Request, credentials: HTTPAuthorizationCredentia
     
     logger.info("Image received!")
     image_received_time = time.time()
+    stage_timings = getattr(request.state, "stage_timings", {})
+    stage_start = image_received_time
+
+    def _mark(stage):
+        nonlocal stage_start
+        now = time.time()
+        stage_timings[stage] = round(now - stage_start, 4)
+        stage_start = now
 
     # Read raw body data
     body = await request.body()
+    _mark("read_body")
     image = Image.open(io.BytesIO(body))
     filename = _save_image(image)
+    _mark("save_image")
     
     global LATEST_IMAGE
     LATEST_IMAGE = filename
 
-    description = llm_client.tongyi_get_description_from_image(filename)
-    _save_description(description)
+    # Never key on (or log) the raw bearer token
+    device_id = request.headers.get("x-device-id") or hashlib.sha256(credentials.credentials.encode("utf-8")).hexdigest()[:12]
+    previous_description = (
+        scene_tracker.previous_description(device_id, filename) if DELTA_DESCRIPTIONS else None
+    )
+    description = llm_client.tongyi_get_description_from_image(
+        filename, previous_description=previous_description
+    )
+    _mark("describe")
+
+    # The device only hears the changes, but history and dashboard keep the whole scene
+    scene_description = description
+    if DELTA_DESCRIPTIONS:
+        scene_tracker.update(
+            device_id, filename, description,
+            is_delta=previous_description is not None,
+        )
+        scene_description = scene_tracker.context(device_id)
+    _save_description(scene_description)
+    _mark("save_description")
+    latest_frame.publish(app.url_path_for("static", path=os.path.basename(filename)), scene_description)
 
     logger.info(
-        f"New description: {description} (latency: {time.time() - image_received_time:.2f}s)"
+        f"New description: {description} (latency: {time.time() - image_received_time:.2f}s, stages: {stage_timings})"
     )
     
+    # In delta mode an empty description means nothing changed and the device can stay silent
     return {"status": "OK",
-            "description": description}
+            "description": description,
+            "changed": bool(description)}
 
 @app.post(f"{PREFIX}/ask")
 async def ask_image(request: Request, credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from utils.log_utils import get_logger
+
+
+logger = get_logger()
+
+
+class LatestFrame:
+    """
+    In-memory view of the latest uploaded frame and its description.
+
+    The index page, the /latest endpoint and the SSE stream all read from here,
+    so none of them need to rescan the image directory. upload_image calls
+    publish() once a description is ready, which wakes every open stream.
+    close() is called on shutdown so open streams end and uvicorn can exit.
+    """
+
+    KEEPALIVE_INTERVAL = 15  # seconds
+
+    def __init__(self):
+        self.image_url = None
+        self.description = None
+        self.updated_at = None
+        self.version = 0
+        self._changed = asyncio.Event()
+        self._closed = asyncio.Event()
+
+    @property
+    def etag(self):
+        digest = hashlib.sha1(f"{self.image_url}|{self.description}".encode("utf-8")).hexdigest()[:16]
+        return f'"{self.version}-{digest}"'
+
+    def to_dict(self):
+        return {
+            "image": self.image_url,
+            "description": self.description,
+            "updated_at": self.updated_at,
+            "version": self.version,
+        }
+
+    def load_from_dir(self, image_dir, url_for_image):
+        """Seed the state once from the newest .jpg/.txt pair on disk."""
+        if not os.path.isdir(image_dir):
+            return
+
+        def _newest(suffix):
+            files = [f for f in os.listdir(image_dir) if f.endswith(suffix)]
+            return max(files, key=lambda x: os.path.getmtime(os.path.join(image_dir, x)), default=None)
+
+        latest_image = _newest(".jpg")
+        latest_description = _newest(".txt")
+
+        if latest_image:
+            self.image_url = url_for_image(latest_image)
+            self.updated_at = os.path.getmtime(os.path.join(image_dir, latest_image))
+        if latest_description:
+            with open(os.path.join(image_dir, latest_description), encoding="utf-8") as message_file:
+                self.description = message_file.read()
+        logger.debug(f"Latest frame loaded from {image_dir}: {self.image_url}")
+
+    def publish(self, image_url, description):
+        self.image_url = image_url
+        self.description = description
+        self.updated_at = time.time()
+        self.version += 1
+
+        # Wake current subscribers and arm a fresh event for the next update
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def close(self):
+        self._closed.set()
+        # Wake streams blocked on the change event so they notice the shutdown
+        self._changed.set()
+
+    def matches(self, if_none_match):
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags or f"W/{self.etag}" in tags
+
+    async def stream(self, request):
+        """Yield SSE messages for the current frame and each later update."""
+        sent_version = self.version
+        yield self._format_event()
+        while not self._closed.is_set() and not await request.is_disconnected():
+            # publish() may have run while we were suspended in a yield, so
+            # compare versions before waiting on the (possibly new) event
+            if self.version == sent_version:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=self.KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+            if self._closed.is_set():
+                return
+            sent_version = self.version
+            yield self._format_event()
+
+    def _format_event(self):
+        data = json.dumps(self.to_dict(), ensure_ascii=False)
+        return f"id: {self.version}\nevent: frame\ndata: {data}\n\n"
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+
+from fastapi import Request
+
+from utils.log_utils import LogUtils, get_logger
+
+
+# Sampling profiler, optional
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:
+    print("Warning: pyinstrument not installed. Install it with 'pip install pyinstrument' for request profiling.")
+    Profiler = None
+
+
+logger = get_logger()
+
+
+class RequestProfiler:
+    """
+    Opt-in per-request sampling profiler.
+
+    A request is profiled when any of the following holds:
+        - PROFILE_REQUESTS=1 is set in the environment (profile everything)
+        - the request is picked by PROFILE_SAMPLE_RATE (e.g. 0.01 for 1% of traffic)
+        - the request carries the X-Profile header and a valid bearer token
+
+    Each profile is written as a speedscope file under logs/profiles/, next to a
+    small JSON sidecar holding the request id, path, total latency and the stage
+    timings recorded by the endpoint in request.state.stage_timings. Only the
+    newest PROFILE_MAX_FILES profiles are kept. Requests under skip_paths
+    (static files, event streams) are never profiled.
+    """
+
+    PROFILE_HEADER = "x-profile"
+    REQUEST_ID_HEADER = "x-request-id"
+    REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+    DEFAULT_PROFILE_DIR = os.path.join(LogUtils.DEFAULT_LOG_DIR, "profiles")
+    DEFAULT_INTERVAL = 0.001  # seconds between samples
+    DEFAULT_MAX_FILES = 200
+
+    def __init__(self, profile_dir=DEFAULT_PROFILE_DIR, interval=None, skip_paths=()):
+        self.profile_dir = profile_dir
+        self.skip_paths = tuple(skip_paths)
+        self.max_files = int(os.getenv("PROFILE_MAX_FILES", self.DEFAULT_MAX_FILES))
+        self.always_on = os.getenv("PROFILE_REQUESTS", "0") == "1"
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.interval = interval or float(os.getenv("PROFILE_INTERVAL", self.DEFAULT_INTERVAL))
+
+        if Profiler is None and (self.always_on or self.sample_rate > 0):
+            logger.warning("Request profiling requested but pyinstrument is not installed")
+
+    def should_profile(self, request: Request):
+        if Profiler is None:
+            return False
+        if request.url.path.startswith(self.skip_paths):
+            return False
+        if self.always_on:
+            return True
+        if request.headers.get(self.PROFILE_HEADER) and _is_authenticated(request):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, request: Request, call_next):
+        # The request id ends up in profile filenames, so only accept safe client values
+        request_id = request.headers.get(self.REQUEST_ID_HEADER, "")
+        if not self.REQUEST_ID_PATTERN.fullmatch(request_id):
+            request_id = uuid.uuid4().hex[:12]
+        request.state.request_id = request_id
+        request.state.stage_timings = {}
+
+        if not self.should_profile(request):
+            response = await call_next(request)
+            response.headers["X-Request-ID"] = request_id
+            return response
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        start_time = time.time()
+        profiler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.stop()
+            meta = {
+                "request_id": request_id,
+                "method": request.method,
+                "path": request.url.path,
+                "total": round(time.time() - start_time, 4),
+                "stage_timings": getattr(request.state, "stage_timings", {}),
+            }
+            # Rendering thousands of samples is slow, keep it off the event loop
+            await asyncio.to_thread(self._dump, profiler, meta)
+
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+    def _dump(self, profiler, meta):
+        request_id = meta["request_id"]
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            datestr = datetime.now().strftime("%Y-%m-%d_%H%M%S.%f")[:-3]
+            basename = os.path.join(self.profile_dir, f"{datestr}_{request_id}")
+
+            with open(f"{basename}.speedscope.json", "w", encoding="utf-8") as profile_file:
+                profile_file.write(profiler.output(renderer=SpeedscopeRenderer()))
+
+            with open(f"{basename}.meta.json", "w", encoding="utf-8") as meta_file:
+                json.dump(meta, meta_file, indent=2)
+
+            logger.info(f"Profile saved as {basename}.speedscope.json (request {request_id}, {meta['total']:.2f}s)")
+            self._prune()
+        except Exception as e:
+            logger.error(f"Error saving profile for request {request_id}: {str(e)}")
+
+    def _prune(self):
+        # Filenames start with the timestamp, so name order is age order
+        profiles = sorted(f for f in os.listdir(self.profile_dir) if f.endswith(".speedscope.json"))
+        expired = profiles[:max(len(profiles) - self.max_files, 0)]
+        for profile in expired:
+            basename = os.path.join(self.profile_dir, profile[:-len(".speedscope.json")])
+            for suffix in (".speedscope.json", ".meta.json"):
+                if os.path.exists(f"{basename}{suffix}"):
+                    os.remove(f"{basename}{suffix}")
+        if expired:
+            logger.debug(f"Pruned {len(expired)} old profiles from {self.profile_dir}")
+
+
+def _is_authenticated(request: Request):
+    auth = request.headers.get("authorization", "")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    return token in os.getenv("BEARER_TOKENS", "").split(",")
@@ -0,0 +1,88 @@
+import os
+import time
+
+from PIL import Image, ImageChops, ImageStat
+
+from utils.log_utils import get_logger
+
+
+logger = get_logger()
+
+
+def scene_difference(image_a, image_b, size=(32, 32)):
+    """Mean absolute pixel difference (0..1) between two downscaled grayscale frames."""
+    with Image.open(image_a) as a, Image.open(image_b) as b:
+        small_a = a.convert("L").resize(size)
+        small_b = b.convert("L").resize(size)
+    diff = ImageChops.difference(small_a, small_b)
+    return ImageStat.Stat(diff).mean[0] / 255
+
+
+class SceneTracker:
+    """
+    Per-device memory used by delta descriptions.
+
+    For each device it keeps the last full description, the changes reported
+    since then and the last frame. previous_description() returns that context
+    when a delta is appropriate, or None to force a full description after a
+    scene cut or once the last full description is older than max_age seconds.
+
+    Callers may pass `now` (epoch seconds) to replay recorded frames with their
+    capture times instead of the wall clock.
+    """
+
+    DEFAULT_MAX_AGE = 30  # seconds
+    DEFAULT_SCENE_CUT_THRESHOLD = 0.25
+
+    def __init__(self, max_age=None, scene_cut_threshold=None):
+        if max_age is None:
+            max_age = float(os.getenv("DELTA_MAX_AGE", self.DEFAULT_MAX_AGE))
+        if scene_cut_threshold is None:
+            scene_cut_threshold = float(os.getenv("DELTA_SCENE_CUT_THRESHOLD", self.DEFAULT_SCENE_CUT_THRESHOLD))
+        self.max_age = max_age
+        self.scene_cut_threshold = scene_cut_threshold
+        self.devices = {}
+
+    def context(self, device_id):
+        """Last full description followed by the changes reported since then."""
+        state = self.devices.get(device_id)
+        if state is None:
+            return None
+        return "\n".join([state["description"], *state["changes"]])
+
+    def previous_description(self, device_id, image_fp, now=None):
+        state = self.devices.get(device_id)
+        if state is None:
+            return None
+
+        now = time.time() if now is None else now
+        if now - state["full_time"] > self.max_age:
+            logger.info(f"Device {device_id}: full description is stale, refreshing")
+            return None
+
+        try:
+            difference = scene_difference(state["image"], image_fp)
+        except Exception as e:
+            logger.error(f"Error comparing frames for device {device_id}: {str(e)}")
+            return None
+        if difference > self.scene_cut_threshold:
+            logger.info(f"Device {device_id}: scene cut detected (difference {difference:.2f})")
+            return None
+
+        return self.context(device_id)
+
+    def update(self, device_id, image_fp, description, is_delta, now=None):
+        if not is_delta or device_id not in self.devices:
+            self.devices[device_id] = {
+                "image": image_fp,
+                "description": description,
+                "changes": [],
+                "full_time": time.time() if now is None else now,
+            }
+            return
+
+        state = self.devices[device_id]
+        state["image"] = image_fp
+        # An empty delta means nothing changed
+        if description:
+            state["changes"].append(description)